@@ -37,6 +37,7 @@ import errno
 import getopt
 import logging
 import os
+import stat
 import sys
 
 from fusepy.fuse import FUSE, FuseOSError, Operations
@@ -72,24 +73,50 @@ class BTSyncRewinder(Operations):
 
     def readdir(self, virt_abs_path, fh):
         timestamp, rel_path = core.get_timestamp_and_rel_path(virt_abs_path)
-        return core.readdir(timestamp, rel_path, self.root_dir)
+        dirents = []
+        for name, real_abs_path in core.readdir_with_paths(timestamp, rel_path,
+                                                           self.root_dir):
+            # With use_ino, FUSE takes each entry's d_ino from these attrs, so
+            # report the same inode number getattr would.
+            if real_abs_path == None:
+                if name == '.':
+                    entry_path = virt_abs_path
+                elif name == '..':
+                    entry_path = os.path.dirname(virt_abs_path)
+                else:
+                    entry_path = os.path.join(virt_abs_path, name)
+                attrs = {'st_ino': core.dir_inode_number(entry_path),
+                         'st_mode': stat.S_IFDIR}
+            else:
+                st = os.lstat(real_abs_path)
+                attrs = {'st_ino': core.file_inode_number(st),
+                         'st_mode': st.st_mode}
+            dirents.append((name, attrs, 0))
+        return dirents
 
     def getattr(self, virt_abs_path, fh=None):
         timestamp, rel_path = core.get_timestamp_and_rel_path(virt_abs_path)
         if rel_path != '':
-            file_timestamp, real_abs_path = core.resolve_file(
-                timestamp, rel_path, self.root_dir)
+            ts_and_path = core.resolve_file(timestamp, rel_path, self.root_dir)
+            real_abs_path = ts_and_path[1] if ts_and_path else None
         else:
-            file_timestamp, real_abs_path = (0, self.root_dir)
+            real_abs_path = self.root_dir
 
         if real_abs_path == None:
             # Return fake info if not found. Optimistically assume this call is
             # for a dir, not a file and return fake info. TODO: fix this.
             real_abs_path = self.root_dir
         st = os.lstat(real_abs_path)
-        return dict((key, getattr(st, key))
-                    for key in ('st_atime', 'st_ctime', 'st_gid', 'st_mode',
-                                'st_mtime', 'st_nlink', 'st_size', 'st_uid'))
+        attrs = dict((key, getattr(st, key))
+                     for key in ('st_atime', 'st_ctime', 'st_gid', 'st_mode',
+                                 'st_mtime', 'st_nlink', 'st_size', 'st_uid'))
+        # A file version keeps its inode number across snapshots so backup
+        # and dedup tools can tell unchanged files apart from changed ones.
+        if stat.S_ISDIR(st.st_mode):
+            attrs['st_ino'] = core.dir_inode_number(virt_abs_path)
+        else:
+            attrs['st_ino'] = core.file_inode_number(st)
+        return attrs
 
     def access(self, virt_abs_path, mode):
         # Optimistically say all files are accessible.
@@ -160,7 +187,8 @@ def main(foreground, root, mountpoint):
         BTSyncRewinder(root),
         mountpoint,
         nothreads=True,
-        foreground=foreground)
+        foreground=foreground,
+        use_ino=True)
 
 
 def check_and_get_params_from_command_line():
@@ -0,0 +1,77 @@
+import unittest
+import os
+import stat
+
+import btsync_rewind
+from core_test import TestBase
+
+
+class TestInodeNumbers(TestBase, unittest.TestCase):
+    """Tests that getattr and readdir report the same inode number for a file
+    version in every snapshot it appears in, including in dirs that have no
+    counterpart in the archive."""
+
+    def setUp(self):
+        self.make_root_dir()
+        self.rewinder = btsync_rewind.BTSyncRewinder(self.root_dir)
+
+    def tearDown(self):
+        self.delete_root_dir()
+
+    def dirent_attrs(self, virt_abs_path):
+        return dict((name, attrs) for name, attrs, offset in
+                    self.rewinder.readdir(virt_abs_path, None))
+
+    def test_subdir_without_archive(self):
+        t0 = 100000
+
+        # 'a' has a file and a subdir, and nothing under .sync/Archive/a.
+        self.create_file(t0, 'a/f')
+        os.makedirs(os.path.join(self.root_dir, 'a/b'))
+        t1, t2 = '/%d' % (t0 + 1), '/%d' % (t0 + 2)
+
+        self.assertEqual(['.', '..', 'a'], sorted(self.dirent_attrs(t1)))
+        dirents = self.dirent_attrs(t1 + '/a')
+        self.assertEqual(['.', '..', 'b', 'f'], sorted(dirents))
+
+        # Same file version, same inode number in both snapshots and in both
+        # readdir and getattr.
+        f_ino = self.rewinder.getattr(t1 + '/a/f')['st_ino']
+        self.assertEqual(f_ino, self.rewinder.getattr(t2 + '/a/f')['st_ino'])
+        self.assertEqual(f_ino, dirents['f']['st_ino'])
+        self.assertEqual(f_ino, self.dirent_attrs(t2 + '/a')['f']['st_ino'])
+
+        # Subdirs get an inode number that agrees between readdir and getattr
+        # and isn't their parent's.
+        b_attrs = self.rewinder.getattr(t1 + '/a/b')
+        self.assertTrue(stat.S_ISDIR(b_attrs['st_mode']))
+        self.assertTrue(stat.S_ISDIR(dirents['b']['st_mode']))
+        self.assertEqual(b_attrs['st_ino'], dirents['b']['st_ino'])
+        self.assertEqual(self.rewinder.getattr(t1 + '/a')['st_ino'],
+                         dirents['.']['st_ino'])
+        self.assertNotEqual(b_attrs['st_ino'], dirents['.']['st_ino'])
+
+        # Listing the empty subdir works too.
+        self.assertEqual(['.', '..'], sorted(self.dirent_attrs(t1 + '/a/b')))
+
+    def test_live_and_archived_versions(self):
+        t0 = 100000
+
+        self.create_file(t0 - 100, '.sync/Archive/f1')
+        self.create_file(t0, '.sync/Archive/f1.1')
+        self.create_file(t0, 'f1')
+
+        def ino(timestamp):
+            virt_abs_path = '/%d/f1' % timestamp
+            st_ino = self.rewinder.getattr(virt_abs_path)['st_ino']
+            dirents = self.dirent_attrs('/%d' % timestamp)
+            self.assertEqual(st_ino, dirents['f1']['st_ino'])
+            return st_ino
+
+        # Same version at different timestamps.
+        self.assertEqual(ino(t0), ino(t0 + 100))
+        self.assertEqual(ino(t0 - 1), ino(t0 - 100))
+        self.assertEqual(ino(t0 - 101), ino(t0 - 200))
+
+        # Different versions.
+        self.assertEqual(3, len(set([ino(t0), ino(t0 - 1), ino(t0 - 101)])))
@@ -3,6 +3,7 @@
 import os
 import re
 import errno
+import hashlib
 from collections import defaultdict
 from fusepy.fuse import FuseOSError
 import logging
@@ -113,6 +114,55 @@ def archive_file_creation_time(real_abs_path):
     return crtime
 
 
+def file_inode_number(st):
+    """Map the lstat() result of a real file (live or archived) to the inode
+    number reported through FUSE.
+
+    The number is a hash of the real file's device and inode, so the same
+    version of a file has the same inode number in every snapshot it appears
+    in. BTSync moves a superseded live file into the archive with a rename,
+    which preserves its inode, so the number survives that move too. Hashing
+    keeps all the bits of both, which packing them into 64 bits wouldn't.
+
+    The top bit is always clear to keep these apart from dir_inode_number().
+
+    >>> class FakeStat: st_dev, st_ino = 2049, 1234
+    >>> file_inode_number(FakeStat) == file_inode_number(FakeStat)
+    True
+
+    >>> class OtherDevStat: st_dev, st_ino = 66306, 1234
+    >>> file_inode_number(FakeStat) == file_inode_number(OtherDevStat)
+    False
+
+    >>> file_inode_number(FakeStat) < (1 << 63)
+    True
+    """
+    digest = hashlib.md5('%d:%d' % (st.st_dev, st.st_ino)).hexdigest()
+    return int(digest[:16], 16) & ((1 << 63) - 1)
+
+
+def dir_inode_number(fuse_path):
+    """Synthesize an inode number for a directory from its FUSE path.
+
+    Every timestamp dir (and every not-found path) is backed by the same real
+    dir, so the real inode can't be used: tools like find would see a dir
+    that is its own ancestor. Directories get a number derived from the
+    virtual path instead, with the top bit set so it can't collide with
+    file_inode_number().
+
+    >>> dir_inode_number('/2000/dir') == dir_inode_number('/2000/dir')
+    True
+
+    >>> dir_inode_number('/2000/dir') == dir_inode_number('/2001/dir')
+    False
+
+    >>> dir_inode_number('/2000/dir') >= (1 << 63)
+    True
+    """
+    digest = hashlib.md5(fuse_path).hexdigest()
+    return (1 << 63) | (int(digest[:16], 16) & ((1 << 63) - 1))
+
+
 def resolve_file(timestamp, rel_path, root_dir):
     if rel_path.startswith('/') or rel_path.endswith('/') or rel_path == '':
         raise FuseOSError(errno.EINVAL)
@@ -143,7 +193,12 @@ def resolve_file(timestamp, rel_path, root_dir):
 
     archive_path = os.path.join(root_dir, '.sync/Archive', dirname)
     ts_and_paths = []
-    for filename in os.listdir(archive_path):
+    if not os.path.isdir(archive_path):
+        # No previous versions of anything in this dir.
+        filenames = []
+    else:
+        filenames = os.listdir(archive_path)
+    for filename in filenames:
         #print 'filename:', filename
         if re_previous_version_filenames.match(filename):
             #print 'filename:', filename, 'matches'
@@ -177,13 +232,22 @@ def readdir(timestamp, rel_path, root_dir):
     all past and future instants too. This will result in weird output like
     same filename occurring twice if a filename starts as a file and then
     becomes a dir etc.  TODO: Resolve directories better."""
+    return [name for name, real_abs_path in
+            readdir_with_paths(timestamp, rel_path, root_dir)]
+
+
+def readdir_with_paths(timestamp, rel_path, root_dir):
+    """Like readdir, but return (name, real_abs_path) tuples. real_abs_path is
+    the version of the file that resolve_file would pick, or None for
+    directories (including '.' and '..')."""
     live_path = os.path.join(root_dir, rel_path)
     archive_path = os.path.join(root_dir, '.sync/Archive', rel_path)
 
     # decoded filename to live creation times.
     live_crtimes = defaultdict(lambda: -1)
 
-    files_to_be_added = set()
+    # decoded filename to the real path of the version to show.
+    files_to_be_added = {}
     dirs_to_be_added = set()
 
     if os.path.isdir(live_path):
@@ -193,7 +257,7 @@ def readdir(timestamp, rel_path, root_dir):
                 live_crtime = live_file_creation_time(full_path)
                 live_crtimes[filename] = live_crtime
                 if timestamp >= live_crtime:
-                    files_to_be_added.add(filename)
+                    files_to_be_added[filename] = full_path
             elif (rel_path != '') or (filename != '.sync'):
                 # Don't BTsync archive dir at top level.
                 dirs_to_be_added.add(filename)
@@ -222,11 +286,14 @@ def readdir(timestamp, rel_path, root_dir):
             ts_and_paths[0] = (live_crtimes[decoded_filename],
                                ts_and_paths[0][1])
 
+        # The oldest version still valid at 'timestamp' is the one to show,
+        # and it comes last since the list is sorted most recent first.
         for last_valid_timestamp, path in ts_and_paths:
             if timestamp < last_valid_timestamp:
-                files_to_be_added.add(decoded_filename)
+                files_to_be_added[decoded_filename] = path
 
-    return ['.', '..'] + list(files_to_be_added) + list(dirs_to_be_added)
+    return ([('.', None), ('..', None)] + files_to_be_added.items() +
+            [(dirname, None) for dirname in dirs_to_be_added])
 
 
 if __name__ == '__main__':
@@ -218,3 +218,47 @@ class TestReadDirSimple(TestBase, unittest.TestCase):
     def test_no_live_two_versions_subdir(self):
         return self.test_no_live_two_versions(
             'dir2/f4', '.sync/Archive/dir2/f4.1', '.sync/Archive/dir2/f4')
+
+
+class TestInodeNumbers(TestBase, unittest.TestCase):
+    """Tests that each version of a file keeps one inode number across all
+    the snapshots it appears in, and that different versions don't share
+    one."""
+
+    def setUp(self):
+        self.make_root_dir()
+
+    def tearDown(self):
+        self.delete_root_dir()
+
+    def inode_number(self, timestamp, rel_path):
+        ts_and_abs_path = core.resolve_file(timestamp, rel_path, self.root_dir)
+        return core.file_inode_number(os.lstat(ts_and_abs_path[1]))
+
+    def test_live_and_two_versions(self):
+        t0 = 100000
+
+        self.create_file(t0 - 100, '.sync/Archive/f1')
+        self.create_file(t0, '.sync/Archive/f1.1')
+        self.create_file(t0, 'f1')
+
+        # Same version at different timestamps has the same inode number.
+        self.assertEqual(self.inode_number(t0, 'f1'),
+                         self.inode_number(t0 + 100, 'f1'))
+        self.assertEqual(self.inode_number(t0 - 1, 'f1'),
+                         self.inode_number(t0 - 100, 'f1'))
+        self.assertEqual(self.inode_number(t0 - 101, 'f1'),
+                         self.inode_number(t0 - 200, 'f1'))
+
+        # Different versions have different inode numbers.
+        inode_numbers = set([self.inode_number(t0, 'f1'),
+                             self.inode_number(t0 - 1, 'f1'),
+                             self.inode_number(t0 - 101, 'f1')])
+        self.assertEqual(3, len(inode_numbers))
+
+    def test_dirs_distinct_from_files(self):
+        self.create_file(100000, 'f1')
+        file_inode_number = self.inode_number(100000, 'f1')
+        self.assertNotEqual(file_inode_number, core.dir_inode_number('/100000'))
+        self.assertNotEqual(core.dir_inode_number('/100000'),
+                            core.dir_inode_number('/100001'))